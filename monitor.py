@@ -1,24 +1,37 @@
 import os
-import base64
 import json
-import tempfile
 import textwrap
 
+import pybase64 as base64
 import requests
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
 TARGET_URL = os.environ["TARGET_URL"]
 WEBHOOK_URL = os.environ["WEBHOOK_URL"]
 STORAGE_STATE_B64 = os.environ["STORAGE_STATE_B64"]
+# Optional: ws:// endpoint of a long-running `playwright launch-server`.
+# When set we connect to that browser instead of launching a new one.
+PW_WS = os.environ.get("PW_WS")
 
+# Resource types we never need for reading the table. Stylesheets are kept
+# because the scraped td.innerText depends on computed styles.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
 
-def write_storage_state_file() -> str:
-    """Decode STORAGE_STATE_B64 into a temporary JSON file and return its path."""
-    data = base64.b64decode(STORAGE_STATE_B64)
-    fd, path = tempfile.mkstemp(suffix=".json")
-    with os.fdopen(fd, "wb") as f:
-        f.write(data)
-    return path
+# A tbody cell that is not DataTables' "Loading..."/"No data" placeholder.
+ROW_READY_SELECTOR = "table.dataTable tbody tr td:not(.dataTables_empty)"
+
+
+def load_storage_state() -> dict:
+    """Decode STORAGE_STATE_B64 into a Playwright storage_state dict."""
+    return json.loads(base64.b64decode(STORAGE_STATE_B64))
+
+
+def block_unneeded_resources(route):
+    """Abort requests for assets that do not affect the table contents."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
 
 
 def scrape_rows(page):
@@ -27,27 +40,30 @@ def scrape_rows(page):
 
     Adjust selectors here if ZwiftPower changes layout.
     """
-    # Make sure we are on the right page and JS has run
-    page.goto(TARGET_URL, wait_until="networkidle")
+    # Only wait for the document; the data-row wait below is the readiness signal
+    page.goto(TARGET_URL, wait_until="domcontentloaded")
 
-    # Try to wait for any ZwiftPower DataTable
+    # Wait for real data rows; DataTables draws a placeholder row before its
+    # AJAX data arrives. 45s = the 30s networkidle budget that used to absorb
+    # the data fetch, plus the previous 15s row wait.
     try:
-        page.wait_for_selector("table.dataTable tbody tr", timeout=15000)
+        page.wait_for_selector(ROW_READY_SELECTOR, timeout=45000)
     except PlaywrightTimeoutError:
         # Return empty but with some debug context
         return [], {
             "title": page.title(),
             "url": page.url,
-            "note": "Timed out waiting for table.dataTable tbody tr"
+            "note": f"Timed out waiting for {ROW_READY_SELECTOR}"
         }
 
-    rows = []
-    for tr in page.query_selector_all("table.dataTable tbody tr"):
-        tds = tr.query_selector_all("td")
-        if not tds:
-            continue
-        cols = [td.inner_text().strip() for td in tds]
-        rows.append(cols)
+    # Read every cell in one round-trip instead of one per row and per cell
+    rows = page.eval_on_selector_all(
+        "table.dataTable tbody tr",
+        """trs => trs
+            .filter(tr => !tr.querySelector("td.dataTables_empty"))
+            .map(tr => [...tr.querySelectorAll("td")].map(td => td.innerText.trim()))
+            .filter(cols => cols.length > 0)""",
+    )
 
     debug_info = {
         "title": page.title(),
@@ -102,11 +118,15 @@ def send_to_webhook(content: str):
 
 
 def main():
-    storage_state_path = write_storage_state_file()
+    storage_state = load_storage_state()
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(storage_state=storage_state_path)
+        if PW_WS:
+            browser = p.chromium.connect(PW_WS)
+        else:
+            browser = p.chromium.launch(headless=True)
+        context = browser.new_context(storage_state=storage_state)
+        context.route("**/*", block_unneeded_resources)
         page = context.new_page()
 
         rows, debug = scrape_rows(page)